@@ -0,0 +1,124 @@
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Protocol, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL = 3600
+
+class CacheBackend(Protocol):
+    async def get(self, key: str) -> Optional[str]:
+        ...
+
+    async def set(self, key: str, value: str, ttl: int) -> None:
+        ...
+
+    async def close(self) -> None:
+        ...
+
+class MemoryCacheBackend:
+    """In-process LRU cache with per-entry expiry"""
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+
+    async def get(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: str, ttl: int) -> None:
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    async def close(self) -> None:
+        self._entries.clear()
+
+class RedisCacheBackend:
+    """Redis-backed cache shared between workers"""
+
+    def __init__(self, url: str):
+        import redis.asyncio as redis
+
+        self._client = redis.from_url(url, decode_responses=True)
+
+    async def get(self, key: str) -> Optional[str]:
+        return await self._client.get(key)
+
+    async def set(self, key: str, value: str, ttl: int) -> None:
+        await self._client.set(key, value, ex=ttl)
+
+    async def close(self) -> None:
+        await self._client.aclose()
+
+def make_cache_key(provider: str, model: str, system_message: str, prompt: str) -> str:
+    """Hash everything that determines a completion into a cache key.
+
+    Callers that want distinct completions for otherwise identical input
+    must make that difference part of the prompt.
+    """
+    payload = json.dumps({"p": provider, "m": model, "s": system_message, "u": prompt}, sort_keys=True)
+    return "llm:" + hashlib.sha256(payload.encode()).hexdigest()
+
+class LLMCache:
+    """LLM completion cache that never fails the request it serves"""
+
+    def __init__(self, backend: CacheBackend, ttl: int = DEFAULT_TTL):
+        self.backend = backend
+        self.ttl = ttl
+        self.stats: Dict[str, int] = {"hits": 0, "misses": 0, "errors": 0}
+
+    async def get(self, key: str) -> Optional[str]:
+        try:
+            value = await self.backend.get(key)
+        except Exception as e:
+            logger.warning(f"LLM cache lookup failed: {e}")
+            self.stats["errors"] += 1
+            value = None
+        if value is None:
+            self.stats["misses"] += 1
+        else:
+            self.stats["hits"] += 1
+        return value
+
+    async def set(self, key: str, value: str, ttl: Optional[int] = None) -> None:
+        try:
+            await self.backend.set(key, value, ttl or self.ttl)
+        except Exception as e:
+            logger.warning(f"LLM cache store failed: {e}")
+            self.stats["errors"] += 1
+
+    async def close(self) -> None:
+        await self.backend.close()
+
+    def get_stats(self) -> Dict[str, object]:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            "backend": type(self.backend).__name__,
+            **self.stats,
+            "hit_rate": self.stats["hits"] / lookups if lookups else 0.0,
+        }
+
+def create_llm_cache() -> LLMCache:
+    """Use Redis when REDIS_URL is set, otherwise an in-process cache"""
+    ttl = int(os.environ.get("LLM_CACHE_TTL", DEFAULT_TTL))
+    redis_url = os.environ.get("REDIS_URL")
+    if redis_url:
+        try:
+            return LLMCache(RedisCacheBackend(redis_url), ttl=ttl)
+        except ImportError:
+            logger.warning("REDIS_URL is set but redis is not installed, using in-process LLM cache")
+    return LLMCache(MemoryCacheBackend(), ttl=ttl)
@@ -1,18 +1,25 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Query, BackgroundTasks
+from fastapi import FastAPI, APIRouter, HTTPException, Query, BackgroundTasks, Response
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
-from motor.motor_asyncio import AsyncIOMotorClient
+from starlette.middleware.gzip import GZipMiddleware
+from pymongo import AsyncMongoClient, ReturnDocument
+from pymongo.errors import OperationFailure, PyMongoError
 import os
 import logging
 from pathlib import Path
-from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any
+from pydantic import BaseModel, Field, ValidationError, model_validator
+from typing import List, Optional, Dict, Any, AsyncIterator, Type, TypeVar
 import uuid
-from datetime import datetime
+import asyncio
+from datetime import datetime, timezone
 from enum import Enum
-import json
+import csv
+import io
+import orjson
 import aiofiles
 from emergentintegrations.llm.chat import LlmChat, UserMessage
+from llm_cache import create_llm_cache, make_cache_key
 # Temporarily removing Unsplash functionality
 # from python_unsplash import PyUnsplash
 
@@ -21,11 +28,14 @@ load_dotenv(ROOT_DIR / '.env')
 
 # MongoDB connection
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+client = AsyncMongoClient(mongo_url, tz_aware=True)
 db = client[os.environ['DB_NAME']]
 
+# LLM response cache (Redis when REDIS_URL is set, in-process otherwise)
+llm_cache = create_llm_cache()
+
 # Create the main app without a prefix
-app = FastAPI(title="AI Marketing Assistant", version="1.0.0")
+app = FastAPI(title="AI Marketing Assistant", version="1.0.0", default_response_class=ORJSONResponse)
 
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
@@ -37,6 +47,8 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+UTC = timezone.utc
+
 # Enums
 class PostType(str, Enum):
     GENERAL_UPDATE = "General Update"
@@ -68,8 +80,23 @@ class AIProvider(str, Enum):
     GEMINI = "gemini"
     GROQ = "groq"
 
+# Limits
+MAX_VARIANTS = 5  # Matches the frontend's variant picker
+MAX_CONCURRENT_AI_CALLS = 4  # Per generate-posts request, to stay under provider rate limits
+
 # Models
-class APIConfiguration(BaseModel):
+class TimestampedModel(BaseModel):
+    """Fills unset created_at/updated_at fields from a single clock read"""
+    
+    @model_validator(mode="after")
+    def _set_timestamps(self):
+        now = datetime.now(UTC)
+        for name in ("created_at", "updated_at"):
+            if name in type(self).model_fields and getattr(self, name) is None:
+                setattr(self, name, now)
+        return self
+
+class APIConfiguration(TimestampedModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     user_id: str = "default"  # For now using default user
     openai_api_key: Optional[str] = None
@@ -77,8 +104,8 @@ class APIConfiguration(BaseModel):
     gemini_api_key: Optional[str] = None
     groq_api_key: Optional[str] = None
     unsplash_api_key: Optional[str] = None
-    created_at: datetime = Field(default_factory=datetime.utcnow)
-    updated_at: datetime = Field(default_factory=datetime.utcnow)
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
 
 class APIConfigurationCreate(BaseModel):
     openai_api_key: Optional[str] = None
@@ -102,7 +129,7 @@ class PostGenerationRequest(BaseModel):
     include_emojis: bool = False
     include_seo_optimization: bool = False
     seo_keywords: Optional[str] = None
-    variants_count: int = 1
+    variants_count: int = Field(1, ge=1, le=MAX_VARIANTS)
     audience_target: Optional[AudienceTarget] = None
     ai_provider: AIProvider = AIProvider.OPENAI
     ai_model: str = "gpt-4o-mini"
@@ -113,13 +140,18 @@ class PostContent(BaseModel):
     hashtags: Optional[List[str]] = None
     meta_description: Optional[str] = None
 
-class GeneratedPost(BaseModel):
+class AIPostResponse(BaseModel):
+    content: str = ""
+    hashtags: Optional[List[str]] = None
+    meta_description: Optional[str] = None
+
+class GeneratedPost(TimestampedModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     user_id: str = "default"
     original_request: PostGenerationRequest
     post_contents: List[PostContent]
     variant_number: int
-    created_at: datetime = Field(default_factory=datetime.utcnow)
+    created_at: Optional[datetime] = None
 
 class ContentRewriteRequest(BaseModel):
     original_content: str
@@ -134,7 +166,7 @@ class PostAnalysisRequest(BaseModel):
     ai_provider: AIProvider = AIProvider.OPENAI
     ai_model: str = "gpt-4o-mini"
 
-class PostAnalysisResult(BaseModel):
+class PostAnalysisResult(TimestampedModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     content: str
     platform: Platform
@@ -144,9 +176,17 @@ class PostAnalysisResult(BaseModel):
     platform_best_practices_score: int
     overall_score: int
     improvement_tips: List[str]
-    created_at: datetime = Field(default_factory=datetime.utcnow)
+    created_at: Optional[datetime] = None
 
-class ScheduledPost(BaseModel):
+class AIAnalysisResponse(BaseModel):
+    engagement_score: int = 0
+    readability_score: int = 0
+    tone_consistency_score: int = 0
+    platform_best_practices_score: int = 0
+    overall_score: int = 0
+    improvement_tips: List[str] = []
+
+class ScheduledPost(TimestampedModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     user_id: str = "default"
     platform: Platform
@@ -154,7 +194,7 @@ class ScheduledPost(BaseModel):
     hashtags: Optional[List[str]] = None
     scheduled_date: datetime
     status: str = "scheduled"  # scheduled, published, cancelled
-    created_at: datetime = Field(default_factory=datetime.utcnow)
+    created_at: Optional[datetime] = None
 
 class ScheduledPostCreate(BaseModel):
     platform: Platform
@@ -169,38 +209,67 @@ class UnsplashImage(BaseModel):
     description: Optional[str]
     download_url: str
 
+# API configuration cache, refreshed whenever the configuration is written
+_config_cache: Optional[Dict[str, Any]] = None
+_config_lock = asyncio.Lock()
+
+async def get_cached_config() -> Dict[str, Any]:
+    """Get the default user's API configuration, reading MongoDB only on a cache miss"""
+    global _config_cache
+    if _config_cache is None:
+        async with _config_lock:
+            if _config_cache is None:
+                _config_cache = await db.api_configurations.find_one({"user_id": "default"}) or {}
+    return _config_cache
+
+async def set_cached_config(config: Dict[str, Any]):
+    """Store a freshly written configuration in the cache.
+
+    Taking the lock means a reader still loading the pre-write document
+    finishes first, and its stale result is then overwritten.
+    """
+    global _config_cache
+    async with _config_lock:
+        _config_cache = config
+
+PROVIDER_KEY_FIELD: Dict[AIProvider, str] = {
+    AIProvider.OPENAI: "openai_api_key",
+    AIProvider.ANTHROPIC: "anthropic_api_key",
+    AIProvider.GEMINI: "gemini_api_key",
+    AIProvider.GROQ: "groq_api_key",
+}
+
+def resolve_api_key(config: Dict[str, Any], provider: AIProvider) -> str:
+    """Get the configured API key for a provider"""
+    api_key = config.get(PROVIDER_KEY_FIELD[provider])
+    if not api_key:
+        raise HTTPException(status_code=400, detail=f"API key for {provider.value} not configured.")
+    return api_key
+
 # API Configuration endpoints
 @api_router.post("/config", response_model=APIConfiguration)
 async def create_or_update_config(config: APIConfigurationCreate):
     """Create or update API configuration"""
     try:
-        # Check if config exists for default user
-        existing_config = await db.api_configurations.find_one({"user_id": "default"})
-        
-        if existing_config:
-            # Update existing config - only update non-None values
-            update_data = {k: v for k, v in config.dict().items() if v is not None and v != ""}
-            update_data["updated_at"] = datetime.utcnow()
-            
-            logger.info(f"Updating config with data: {update_data}")
-            
-            await db.api_configurations.update_one(
-                {"user_id": "default"},
-                {"$set": update_data}
-            )
-            
-            updated_config = await db.api_configurations.find_one({"user_id": "default"})
-            logger.info(f"Config updated successfully")
-            return APIConfiguration(**updated_config)
-        else:
-            # Create new config
-            config_dict = config.dict()
-            config_obj = APIConfiguration(**config_dict, user_id="default")
-            
-            logger.info(f"Creating new config")
-            
-            await db.api_configurations.insert_one(config_obj.dict())
-            return config_obj
+        # Only write non-empty values, creating the document on first save
+        now = datetime.now(UTC)
+        update_data = {k: v for k, v in config.model_dump(exclude_none=True).items() if v != ""}
+        update_data["updated_at"] = now
+        
+        logger.info(f"Saving config fields: {list(update_data.keys())}")
+        
+        updated_config = await db.api_configurations.find_one_and_update(
+            {"user_id": "default"},
+            {
+                "$set": update_data,
+                "$setOnInsert": {"id": str(uuid.uuid4()), "user_id": "default", "created_at": now}
+            },
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        await set_cached_config(updated_config)
+        logger.info("Config saved successfully")
+        return APIConfiguration(**updated_config)
             
     except Exception as e:
         logger.error(f"Error creating/updating config: {e}")
@@ -225,45 +294,54 @@ async def get_config():
         return APIConfiguration(user_id="default")
 
 # Available models for each provider
+AVAILABLE_MODELS = {
+    "openai": [
+        "gpt-4.1",
+        "gpt-4.1-mini", 
+        "gpt-4.1-nano",
+        "o4-mini",
+        "o3-mini",
+        "o3",
+        "o1-mini",
+        "gpt-4o-mini"
+    ],
+    "anthropic": [
+        "claude-sonnet-4-20250514",
+        "claude-opus-4-20250514",
+        "claude-3-7-sonnet-20250219",
+        "claude-3-5-haiku-20241022",
+        "claude-3-5-sonnet-20241022"
+    ],
+    "gemini": [
+        "gemini-2.5-flash-preview-04-17",
+        "gemini-2.5-pro-preview-05-06", 
+        "gemini-2.0-flash",
+        "gemini-2.0-flash-preview-image-generation",
+        "gemini-2.0-flash-lite",
+        "gemini-1.5-flash",
+        "gemini-1.5-flash-8b",
+        "gemini-1.5-pro"
+    ],
+    "groq": [
+        "llama-3.3-70b-versatile",
+        "llama-3.1-8b-instant",
+        "mixtral-8x7b-32768"
+    ]
+}
+AVAILABLE_MODELS_JSON = orjson.dumps(AVAILABLE_MODELS)
+
 @api_router.get("/available-models")
 async def get_available_models():
     """Get available models for each AI provider"""
-    return {
-        "openai": [
-            "gpt-4.1",
-            "gpt-4.1-mini", 
-            "gpt-4.1-nano",
-            "o4-mini",
-            "o3-mini",
-            "o3",
-            "o1-mini",
-            "gpt-4o-mini"
-        ],
-        "anthropic": [
-            "claude-sonnet-4-20250514",
-            "claude-opus-4-20250514",
-            "claude-3-7-sonnet-20250219",
-            "claude-3-5-haiku-20241022",
-            "claude-3-5-sonnet-20241022"
-        ],
-        "gemini": [
-            "gemini-2.5-flash-preview-04-17",
-            "gemini-2.5-pro-preview-05-06", 
-            "gemini-2.0-flash",
-            "gemini-2.0-flash-preview-image-generation",
-            "gemini-2.0-flash-lite",
-            "gemini-1.5-flash",
-            "gemini-1.5-flash-8b",
-            "gemini-1.5-pro"
-        ],
-        "groq": [
-            "llama-3.3-70b-versatile",
-            "llama-3.1-8b-instant",
-            "mixtral-8x7b-32768"
-        ]
-    }
+    return Response(
+        content=AVAILABLE_MODELS_JSON,
+        media_type="application/json",
+        headers={"Cache-Control": "public, max-age=3600"}
+    )
 
 # AI Chat Helper Function
+SYSTEM_MESSAGE = "You are an expert marketing content creator. Generate engaging, platform-optimized content that drives engagement and conversions."
+
 async def get_ai_response(prompt: str, provider: AIProvider, model: str, api_key: str) -> str:
     """Get response from AI provider"""
     try:
@@ -272,17 +350,44 @@ async def get_ai_response(prompt: str, provider: AIProvider, model: str, api_key
         chat = LlmChat(
             api_key=api_key,
             session_id=session_id,
-            system_message="You are an expert marketing content creator. Generate engaging, platform-optimized content that drives engagement and conversions."
+            system_message=SYSTEM_MESSAGE
         ).with_model(provider.value, model)
         
         user_message = UserMessage(text=prompt)
         response = await chat.send_message(user_message)
         
-        return response
-        
     except Exception as e:
         logger.error(f"Error getting AI response: {e}")
         raise HTTPException(status_code=500, detail=f"AI generation failed: {str(e)}")
+    
+    return response
+
+ResponseModelT = TypeVar("ResponseModelT", bound=BaseModel)
+
+async def get_cached_ai_response(
+    prompt: str, provider: AIProvider, model: str, api_key: str, response_model: Type[ResponseModelT]
+) -> ResponseModelT:
+    """Get a structured AI response, served from the LLM cache when possible.
+
+    Only completions that validate as response_model are cached, so a malformed
+    reply is retried against the provider instead of being replayed. Creative
+    endpoints (generate, rewrite) call get_ai_response directly so users get a
+    fresh completion every time.
+    """
+    cache_key = make_cache_key(provider.value, model, SYSTEM_MESSAGE, prompt)
+    cached = await llm_cache.get(cache_key)
+    if cached:
+        return response_model.model_validate_json(cached)
+    
+    response = await get_ai_response(prompt, provider, model, api_key)
+    parsed = response_model.model_validate_json(response)
+    await llm_cache.set(cache_key, response)
+    return parsed
+
+@api_router.get("/cache-stats")
+async def get_cache_stats():
+    """Get LLM response cache statistics"""
+    return llm_cache.get_stats()
 
 # Post Generation endpoints
 @api_router.post("/generate-posts", response_model=List[GeneratedPost])
@@ -290,101 +395,63 @@ async def generate_posts(request: PostGenerationRequest):
     """Generate posts for multiple platforms"""
     try:
         # Get API configuration
-        config = await db.api_configurations.find_one({"user_id": "default"})
+        config = await get_cached_config()
         if not config:
             raise HTTPException(status_code=400, detail="API configuration not found. Please configure your API keys first.")
         
         # Get appropriate API key
-        api_key = None
-        if request.ai_provider == AIProvider.OPENAI and config.get("openai_api_key"):
-            api_key = config["openai_api_key"]
-        elif request.ai_provider == AIProvider.ANTHROPIC and config.get("anthropic_api_key"):
-            api_key = config["anthropic_api_key"]
-        elif request.ai_provider == AIProvider.GEMINI and config.get("gemini_api_key"):
-            api_key = config["gemini_api_key"]
-        elif request.ai_provider == AIProvider.GROQ and config.get("groq_api_key"):
-            api_key = config["groq_api_key"]
-        
-        if not api_key:
-            raise HTTPException(status_code=400, detail=f"API key for {request.ai_provider.value} not configured.")
+        api_key = resolve_api_key(config, request.ai_provider)
         
-        generated_posts = []
+        ai_call_slots = asyncio.Semaphore(MAX_CONCURRENT_AI_CALLS)
         
-        # Generate variants
-        for variant_num in range(1, request.variants_count + 1):
-            platform_posts = []
+        async def gen_one(variant_num: int, platform: Platform):
+            """Generate a single platform post for one variant"""
+            prompt = build_prompt(request, platform, variant_num)
+            async with ai_call_slots:
+                ai_response = await get_ai_response(prompt, request.ai_provider, request.ai_model, api_key)
             
-            for platform in request.platforms:
-                # Build platform-specific prompt
-                prompt = f"""
-Create a {request.tone_style.value.lower()} {request.post_type.value.lower()} post for {platform.value.upper()} about: {request.product_description}
-
-Platform Requirements:
-- {platform.value.upper()}: {get_platform_requirements(platform)}
-
-"""
-                
-                if request.audience_target:
-                    audience_info = []
-                    if request.audience_target.age_range:
-                        audience_info.append(f"Age: {request.audience_target.age_range}")
-                    if request.audience_target.gender:
-                        audience_info.append(f"Gender: {request.audience_target.gender}")
-                    if request.audience_target.interests:
-                        audience_info.append(f"Interests: {request.audience_target.interests}")
-                    if request.audience_target.location:
-                        audience_info.append(f"Location: {request.audience_target.location}")
-                    
-                    if audience_info:
-                        prompt += f"Target Audience: {', '.join(audience_info)}\n"
-                
-                if request.include_emojis:
-                    prompt += "Include relevant emojis to make the post more engaging.\n"
-                
-                if request.include_hashtags:
-                    prompt += "Include 5-10 relevant hashtags at the end.\n"
-                    
-                if request.include_seo_optimization and request.seo_keywords:
-                    prompt += f"Include these SEO keywords naturally: {request.seo_keywords}\n"
-                    prompt += "Also provide a meta description for SEO purposes.\n"
-                
-                if variant_num > 1:
-                    prompt += f"This is variant #{variant_num} - make it different from previous versions while maintaining the same core message.\n"
+            try:
+                # Parse and validate JSON response in one pass
+                parsed = AIPostResponse.model_validate_json(ai_response)
                 
-                prompt += """
-Please respond in this exact JSON format:
-{
-    "content": "The main post content here",
-    "hashtags": ["hashtag1", "hashtag2", "hashtag3"],
-    "meta_description": "SEO meta description if requested"
-}
-
-Only return valid JSON, no additional text."""
-                
-                # Get AI response
-                ai_response = await get_ai_response(prompt, request.ai_provider, request.ai_model, api_key)
+                post_content = PostContent(
+                    platform=platform,
+                    content=parsed.content,
+                    hashtags=parsed.hashtags if request.include_hashtags else None,
+                    meta_description=parsed.meta_description if request.include_seo_optimization else None
+                )
                 
-                try:
-                    # Parse JSON response
-                    response_data = json.loads(ai_response)
-                    
-                    post_content = PostContent(
-                        platform=platform,
-                        content=response_data.get("content", ""),
-                        hashtags=response_data.get("hashtags") if request.include_hashtags else None,
-                        meta_description=response_data.get("meta_description") if request.include_seo_optimization else None
-                    )
-                    platform_posts.append(post_content)
-                    
-                except json.JSONDecodeError:
-                    # Fallback if JSON parsing fails
-                    post_content = PostContent(
-                        platform=platform,
-                        content=ai_response,
-                        hashtags=None,
-                        meta_description=None
-                    )
-                    platform_posts.append(post_content)
+            except ValidationError:
+                # Fallback if JSON parsing fails
+                post_content = PostContent(
+                    platform=platform,
+                    content=ai_response,
+                    hashtags=None,
+                    meta_description=None
+                )
+            
+            return variant_num, platform, post_content
+        
+        # Run the (variant, platform) generations concurrently, at most MAX_CONCURRENT_AI_CALLS at a time
+        tasks = [
+            gen_one(variant_num, platform)
+            for variant_num in range(1, request.variants_count + 1)
+            for platform in request.platforms
+        ]
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+        
+        # gather preserves task order, so each bucket keeps the requested platform order
+        variant_posts: Dict[int, List[PostContent]] = {}
+        for variant_num, platform, post_content in results:
+            variant_posts.setdefault(variant_num, []).append(post_content)
+        
+        generated_posts = []
+        for variant_num in range(1, request.variants_count + 1):
+            platform_posts = variant_posts.get(variant_num, [])
             
             # Create generated post object
             generated_post = GeneratedPost(
@@ -392,28 +459,104 @@ Only return valid JSON, no additional text."""
                 post_contents=platform_posts,
                 variant_number=variant_num
             )
-            
-            # Save to database
-            await db.generated_posts.insert_one(generated_post.dict())
             generated_posts.append(generated_post)
         
+        # Save all variants to database in one round trip
+        docs = [gp.model_dump() for gp in generated_posts]
+        if docs:
+            await db.generated_posts.insert_many(docs, ordered=False)
+        
         return generated_posts
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error generating posts: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+# Static prompt blocks. These are emitted byte-for-byte identically on every
+# call and placed ahead of the request-specific text so providers can reuse
+# their cached prompt prefix.
+PLATFORM_REQUIREMENTS: Dict[Platform, str] = {
+    Platform.FACEBOOK: "Longer posts work well (up to 300 words). Include call-to-action. Focus on community building.",
+    Platform.INSTAGRAM: "Visual-first content. Keep captions engaging but concise. Stories format works well.",
+    Platform.TWITTER: "Keep under 280 characters. Use trending hashtags. Be conversational and timely.",
+    Platform.LINKEDIN: "Professional tone. Can be longer (up to 1300 chars). Include industry insights.",
+    Platform.TIKTOK: "Short, catchy content. Include trending sounds/challenges. Be creative and fun.",
+    Platform.GOOGLE_ADS: "Clear headline, compelling description. Include strong call-to-action. Focus on benefits."
+}
+
+DEFAULT_PLATFORM_REQUIREMENTS = "Create engaging content appropriate for the platform."
+
+POST_JSON_FORMAT_PROMPT = """Please respond in this exact JSON format:
+{
+    "content": "The main post content here",
+    "hashtags": ["hashtag1", "hashtag2", "hashtag3"],
+    "meta_description": "SEO meta description if requested"
+}
+
+Only return valid JSON, no additional text.
+
+"""
+
+PLATFORM_REQUIREMENTS_PROMPT: Dict[Platform, str] = {
+    platform: f"Platform Requirements:\n- {platform.value.upper()}: {requirements}\n\n"
+    for platform, requirements in PLATFORM_REQUIREMENTS.items()
+}
+
+POST_TASK_PROMPT = "Create a {tone} {post_type} post for {platform} about: {description}\n"
+AUDIENCE_PROMPT = "Target Audience: {audience}\n"
+EMOJIS_PROMPT = "Include relevant emojis to make the post more engaging.\n"
+HASHTAGS_PROMPT = "Include 5-10 relevant hashtags at the end.\n"
+SEO_PROMPT = "Include these SEO keywords naturally: {keywords}\nAlso provide a meta description for SEO purposes.\n"
+VARIANT_PROMPT = "This is variant #{variant_num} - make it different from previous versions while maintaining the same core message.\n"
+
+AUDIENCE_FIELDS = (
+    ("age_range", "Age"),
+    ("gender", "Gender"),
+    ("interests", "Interests"),
+    ("location", "Location"),
+)
+
+def build_prompt(request: PostGenerationRequest, platform: Platform, variant_num: int) -> str:
+    """Build the generation prompt for one platform and variant"""
+    parts = [
+        POST_JSON_FORMAT_PROMPT,
+        PLATFORM_REQUIREMENTS_PROMPT[platform],
+        POST_TASK_PROMPT.format(
+            tone=request.tone_style.value.lower(),
+            post_type=request.post_type.value.lower(),
+            platform=platform.value.upper(),
+            description=request.product_description
+        ),
+    ]
+    
+    if request.audience_target:
+        audience_info = [
+            f"{label}: {value}"
+            for field, label in AUDIENCE_FIELDS
+            if (value := getattr(request.audience_target, field))
+        ]
+        if audience_info:
+            parts.append(AUDIENCE_PROMPT.format(audience=", ".join(audience_info)))
+    
+    if request.include_emojis:
+        parts.append(EMOJIS_PROMPT)
+    
+    if request.include_hashtags:
+        parts.append(HASHTAGS_PROMPT)
+    
+    if request.include_seo_optimization and request.seo_keywords:
+        parts.append(SEO_PROMPT.format(keywords=request.seo_keywords))
+    
+    if variant_num > 1:
+        parts.append(VARIANT_PROMPT.format(variant_num=variant_num))
+    
+    return "".join(parts)
+
 def get_platform_requirements(platform: Platform) -> str:
     """Get platform-specific requirements"""
-    requirements = {
-        Platform.FACEBOOK: "Longer posts work well (up to 300 words). Include call-to-action. Focus on community building.",
-        Platform.INSTAGRAM: "Visual-first content. Keep captions engaging but concise. Stories format works well.",
-        Platform.TWITTER: "Keep under 280 characters. Use trending hashtags. Be conversational and timely.",
-        Platform.LINKEDIN: "Professional tone. Can be longer (up to 1300 chars). Include industry insights.",
-        Platform.TIKTOK: "Short, catchy content. Include trending sounds/challenges. Be creative and fun.",
-        Platform.GOOGLE_ADS: "Clear headline, compelling description. Include strong call-to-action. Focus on benefits."
-    }
-    return requirements.get(platform, "Create engaging content appropriate for the platform.")
+    return PLATFORM_REQUIREMENTS.get(platform, DEFAULT_PLATFORM_REQUIREMENTS)
 
 # Content Rewriting endpoint
 @api_router.post("/rewrite-content")
@@ -421,23 +564,12 @@ async def rewrite_content(request: ContentRewriteRequest):
     """Rewrite existing content with new tone/style"""
     try:
         # Get API configuration
-        config = await db.api_configurations.find_one({"user_id": "default"})
+        config = await get_cached_config()
         if not config:
             raise HTTPException(status_code=400, detail="API configuration not found.")
         
         # Get appropriate API key
-        api_key = None
-        if request.ai_provider == AIProvider.OPENAI and config.get("openai_api_key"):
-            api_key = config["openai_api_key"]
-        elif request.ai_provider == AIProvider.ANTHROPIC and config.get("anthropic_api_key"):
-            api_key = config["anthropic_api_key"]
-        elif request.ai_provider == AIProvider.GEMINI and config.get("gemini_api_key"):
-            api_key = config["gemini_api_key"]
-        elif request.ai_provider == AIProvider.GROQ and config.get("groq_api_key"):
-            api_key = config["groq_api_key"]
-        
-        if not api_key:
-            raise HTTPException(status_code=400, detail=f"API key for {request.ai_provider.value} not configured.")
+        api_key = resolve_api_key(config, request.ai_provider)
         
         prompt = f"""
 Rewrite the following post for {request.platform.value.upper()} with a {request.tone_style.value} tone:
@@ -453,6 +585,8 @@ Return only the rewritten content. Do not include any explanations, meta-comment
         
         return {"rewritten_content": rewritten_content}
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error rewriting content: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -463,23 +597,12 @@ async def analyze_post(request: PostAnalysisRequest):
     """Analyze a post and provide improvement suggestions"""
     try:
         # Get API configuration
-        config = await db.api_configurations.find_one({"user_id": "default"})
+        config = await get_cached_config()
         if not config:
             raise HTTPException(status_code=400, detail="API configuration not found.")
         
         # Get appropriate API key
-        api_key = None
-        if request.ai_provider == AIProvider.OPENAI and config.get("openai_api_key"):
-            api_key = config["openai_api_key"]
-        elif request.ai_provider == AIProvider.ANTHROPIC and config.get("anthropic_api_key"):
-            api_key = config["anthropic_api_key"]
-        elif request.ai_provider == AIProvider.GEMINI and config.get("gemini_api_key"):
-            api_key = config["gemini_api_key"]
-        elif request.ai_provider == AIProvider.GROQ and config.get("groq_api_key"):
-            api_key = config["groq_api_key"]
-        
-        if not api_key:
-            raise HTTPException(status_code=400, detail=f"API key for {request.ai_provider.value} not configured.")
+        api_key = resolve_api_key(config, request.ai_provider)
         
         prompt = f"""
 Analyze the following post for {request.platform.value.upper()} and provide detailed scoring:
@@ -515,30 +638,32 @@ Respond in this exact JSON format:
 
 Only return valid JSON, no additional text."""
         
-        ai_response = await get_ai_response(prompt, request.ai_provider, request.ai_model, api_key)
-        
         try:
-            analysis_data = json.loads(ai_response)
+            analysis_data = await get_cached_ai_response(
+                prompt, request.ai_provider, request.ai_model, api_key, AIAnalysisResponse
+            )
             
             analysis_result = PostAnalysisResult(
                 content=request.content,
                 platform=request.platform,
-                engagement_score=analysis_data.get("engagement_score", 0),
-                readability_score=analysis_data.get("readability_score", 0),
-                tone_consistency_score=analysis_data.get("tone_consistency_score", 0),
-                platform_best_practices_score=analysis_data.get("platform_best_practices_score", 0),
-                overall_score=analysis_data.get("overall_score", 0),
-                improvement_tips=analysis_data.get("improvement_tips", [])
+                engagement_score=analysis_data.engagement_score,
+                readability_score=analysis_data.readability_score,
+                tone_consistency_score=analysis_data.tone_consistency_score,
+                platform_best_practices_score=analysis_data.platform_best_practices_score,
+                overall_score=analysis_data.overall_score,
+                improvement_tips=analysis_data.improvement_tips
             )
             
             # Save to database
-            await db.post_analyses.insert_one(analysis_result.dict())
+            await db.post_analyses.insert_one(analysis_result.model_dump())
             
             return analysis_result
             
-        except json.JSONDecodeError:
+        except ValidationError:
             raise HTTPException(status_code=500, detail="Failed to parse AI analysis response")
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error analyzing post: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -589,19 +714,21 @@ async def search_images(query: str, page: int = 1, per_page: int = 15):
 async def schedule_post(post: ScheduledPostCreate):
     """Schedule a post for future publishing"""
     try:
-        scheduled_post = ScheduledPost(**post.dict())
-        await db.scheduled_posts.insert_one(scheduled_post.dict())
+        scheduled_post = ScheduledPost(**post.model_dump())
+        await db.scheduled_posts.insert_one(scheduled_post.model_dump())
         return scheduled_post
     except Exception as e:
         logger.error(f"Error scheduling post: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
-@api_router.get("/scheduled-posts", response_model=List[ScheduledPost])
+@api_router.get("/scheduled-posts", response_model=None, responses={200: {"model": List[ScheduledPost]}})
 async def get_scheduled_posts():
     """Get all scheduled posts"""
     try:
-        posts = await db.scheduled_posts.find({"user_id": "default"}).to_list(1000)
-        return [ScheduledPost(**post) for post in posts]
+        # Documents are written from ScheduledPost, so serialize them directly with
+        # orjson instead of re-validating or walking them with jsonable_encoder
+        posts = await db.scheduled_posts.find({"user_id": "default"}, {"_id": 0}).to_list(1000)
+        return ORJSONResponse(posts)
     except Exception as e:
         logger.error(f"Error getting scheduled posts: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -619,51 +746,87 @@ async def delete_scheduled_post(post_id: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 # Export endpoints
+EXPORT_MEDIA_TYPES = {
+    "csv": "text/csv",
+    "json": "application/json",
+    "txt": "text/plain",
+}
+
+async def iter_export_csv(posts: List[Dict[str, Any]]) -> AsyncIterator[bytes]:
+    """Stream posts as CSV rows, one chunk per post"""
+    # csv.writer handles quoting of commas, quotes and newlines in AI output
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    
+    def flush() -> bytes:
+        chunk = buf.getvalue().encode()
+        buf.seek(0)
+        buf.truncate(0)
+        return chunk
+    
+    writer.writerow(["Platform", "Content", "Hashtags", "Created At"])
+    yield flush()
+    for post in posts:
+        for content in post["post_contents"]:
+            hashtags = " ".join(content.get("hashtags") or [])
+            writer.writerow([content["platform"], content["content"], hashtags, post["created_at"]])
+        yield flush()
+
+async def iter_export_json(posts: List[Dict[str, Any]]) -> AsyncIterator[bytes]:
+    """Stream posts as a JSON array"""
+    yield b"["
+    separator = b"\n"
+    for post in posts:
+        yield separator + orjson.dumps(post, option=orjson.OPT_INDENT_2)
+        separator = b",\n"
+    yield b"\n]"
+
+async def iter_export_txt(posts: List[Dict[str, Any]]) -> AsyncIterator[bytes]:
+    """Stream posts as plain text sections"""
+    divider = "=" * 50 + "\n"
+    for post in posts:
+        section = [
+            f"Generated at: {post['created_at']}\n",
+            f"Variant: {post['variant_number']}\n",
+            divider,
+        ]
+        for content in post["post_contents"]:
+            section.append(f"\n{content['platform'].upper()}:\n")
+            section.append(f"{content['content']}\n")
+            if content.get("hashtags"):
+                section.append(f"Hashtags: {' '.join(content['hashtags'])}\n")
+        section.append("\n" + divider + "\n")
+        yield "".join(section).encode()
+
+EXPORT_WRITERS = {
+    "csv": iter_export_csv,
+    "json": iter_export_json,
+    "txt": iter_export_txt,
+}
+
 @api_router.get("/export-posts/{format}")
 async def export_posts(format: str, post_ids: List[str] = Query(...)):
     """Export posts in various formats"""
     try:
-        if format not in ["csv", "txt", "json"]:
+        if format not in EXPORT_WRITERS:
             raise HTTPException(status_code=400, detail="Unsupported export format")
         
-        # Get posts from database
-        posts = []
-        for post_id in post_ids:
-            post = await db.generated_posts.find_one({"id": post_id})
-            if post:
-                posts.append(post)
+        # Get posts from database in a single query, keeping the requested order
+        cursor = db.generated_posts.find({"id": {"$in": post_ids}}, {"_id": 0})
+        posts_by_id = {post["id"]: post for post in await cursor.to_list(length=len(post_ids))}
+        posts = [posts_by_id[post_id] for post_id in post_ids if post_id in posts_by_id]
         
         if not posts:
             raise HTTPException(status_code=404, detail="No posts found")
         
-        if format == "csv":
-            # Generate CSV content
-            csv_content = "Platform,Content,Hashtags,Created At\n"
-            for post in posts:
-                for content in post["post_contents"]:
-                    hashtags = ",".join(content.get("hashtags", [])) if content.get("hashtags") else ""
-                    csv_content += f'"{content["platform"]}","{content["content"]}","{hashtags}","{post["created_at"]}"\n'
-            
-            return {"content": csv_content, "filename": "posts.csv"}
-            
-        elif format == "json":
-            return {"content": json.dumps(posts, default=str, indent=2), "filename": "posts.json"}
-            
-        elif format == "txt":
-            txt_content = ""
-            for post in posts:
-                txt_content += f"Generated at: {post['created_at']}\n"
-                txt_content += f"Variant: {post['variant_number']}\n"
-                txt_content += "=" * 50 + "\n"
-                for content in post["post_contents"]:
-                    txt_content += f"\n{content['platform'].upper()}:\n"
-                    txt_content += f"{content['content']}\n"
-                    if content.get("hashtags"):
-                        txt_content += f"Hashtags: {' '.join(content['hashtags'])}\n"
-                txt_content += "\n" + "=" * 50 + "\n\n"
-            
-            return {"content": txt_content, "filename": "posts.txt"}
+        return StreamingResponse(
+            EXPORT_WRITERS[format](posts),
+            media_type=EXPORT_MEDIA_TYPES[format],
+            headers={"Content-Disposition": f'attachment; filename="posts.{format}"'}
+        )
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error exporting posts: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -675,19 +838,52 @@ async def root():
 
 @api_router.get("/health")
 async def health_check():
-    return {"status": "healthy", "timestamp": datetime.utcnow()}
+    return {"status": "healthy", "timestamp": datetime.now(UTC)}
 
 # Include the router in the main app
 app.include_router(api_router)
 
+# Comma-separated frontend origins; credentials are only allowed for explicit origins
+allowed_origins = [origin.strip() for origin in os.environ.get("ALLOWED_ORIGINS", "").split(",") if origin.strip()]
+
 app.add_middleware(
     CORSMiddleware,
-    allow_credentials=True,
-    allow_origins=["*"],
+    allow_credentials=bool(allowed_origins),
+    allow_origins=allowed_origins or ["*"],
     allow_methods=["*"],
     allow_headers=["*"],
 )
 
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=5)
+
+# Indexes for every id/user_id lookup: (collection, keys, unique)
+INDEXES = [
+    ("api_configurations", "user_id", True),
+    ("generated_posts", "id", True),
+    ("generated_posts", "user_id", False),
+    ("scheduled_posts", "id", True),
+    ("scheduled_posts", [("user_id", 1), ("scheduled_date", 1)], False),
+    ("post_analyses", "id", True),
+]
+
+@app.on_event("startup")
+async def init_indexes():
+    """Create indexes, logging failures instead of failing startup.
+
+    Existing databases may hold duplicates (e.g. several default configs written
+    before the upsert), which makes a unique index fail; the app still runs
+    without it. An unreachable MongoDB is waited on only once.
+    """
+    for collection, keys, unique in INDEXES:
+        try:
+            await db[collection].create_index(keys, unique=unique)
+        except OperationFailure as e:
+            logger.error(f"Could not create index {keys!r} on {collection}: {e}")
+        except PyMongoError as e:
+            logger.error(f"Skipping index creation, MongoDB is unavailable: {e}")
+            return
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
-    client.close()
+    await client.close()
+    await llm_cache.close()
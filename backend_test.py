@@ -1,29 +1,173 @@
-import requests
+import asyncio
+import httpx
+import importlib.util
+import os
 import unittest
 import json
+import orjson
 import re
+import time
 from datetime import datetime, timedelta
+from unittest import mock
+
+import tests  # noqa: F401  (puts backend/ on sys.path)
 
 # Use the public endpoint for testing
 BACKEND_URL = "https://cd87bbbe-f3e6-4246-83d8-829e2326a985.preview.emergentagent.com/api"
 
-class AIMarketingAssistantAPITest(unittest.TestCase):
+# Requests are served by the real app in-process, with MongoDB and the AI
+# providers stubbed, unless BACKEND_TEST_LIVE=1, which runs the suite as
+# integration tests against BACKEND_URL
+LIVE_BACKEND = os.environ.get("BACKEND_TEST_LIVE") == "1"
+IN_PROCESS_URL = "http://testserver/api"
+
+# The in-process run needs the backend's dependencies plus backend/requirements-test.txt
+MISSING_MODULES = [
+    module for module in ("emergentintegrations", "mongomock_motor")
+    if importlib.util.find_spec(module) is None
+]
+BACKEND_AVAILABLE = not MISSING_MODULES
+if BACKEND_AVAILABLE and not LIVE_BACKEND:
+    # mongomock-motor doubles motor's API, which pymongo's AsyncMongoClient mirrors for the calls the app makes
+    from mongomock_motor import AsyncMongoMockClient
+    import server
+
+# Phrases that show the AI explained its rewrite instead of returning only the post
+META_COMMENTARY_RE = re.compile(
+    r"here['’]s a rewritten|i['’]ve rewritten|here is a|here['’]s how|i would rewrite|rewritten version",
+    re.IGNORECASE
+)
+
+# Provider keys stored before the in-process run, so the AI endpoints are exercised
+TEST_API_KEYS = {
+    "openai_api_key": "test_openai_key",
+    "anthropic_api_key": "test_anthropic_key",
+    "gemini_api_key": "test_gemini_key",
+    "groq_api_key": "test_groq_key"
+}
+
+# Completions returned by the stubbed provider for rewrite prompts
+STUB_REWRITES = {
+    "openai": "Discover our latest product, designed to make your work easier. Learn more today.",
+    "anthropic": "Meet the product our customers have been waiting for. See what it can do for you.",
+    "gemini": "Our newest release is here, built to help your business grow. Explore it now.",
+    "groq": "Introducing a smarter way to get things done. Find out how our new product helps."
+}
+
+def _json(response):
+    """Parse a response body with orjson"""
+    return orjson.loads(response.content)
+
+async def stub_ai_response(prompt, provider, model, api_key):
+    """Stand-in for server.get_ai_response that answers the way a provider would"""
+    if prompt.lstrip().startswith("Analyze"):
+        content = re.search(r'Post Content: "(.*)"', prompt).group(1)
+        # Shouty promotional copy scores lower than measured professional copy
+        score = max(0, 85 - 10 * content.count("!"))
+        return json.dumps({
+            "engagement_score": score,
+            "readability_score": score,
+            "tone_consistency_score": score,
+            "platform_best_practices_score": score,
+            "overall_score": score,
+            "improvement_tips": ["Add a clear call-to-action", "Tailor the message to your audience"]
+        })
+    return STUB_REWRITES[provider.value]
+
+class AIMarketingAssistantAPITest(unittest.IsolatedAsyncioTestCase):
     """Test suite for the AI Marketing Assistant API"""
 
-    def test_01_health_check(self):
+    @classmethod
+    def setUpClass(cls):
+        if not LIVE_BACKEND and not BACKEND_AVAILABLE:
+            reason = f"in-process backend needs {', '.join(MISSING_MODULES)}; install backend/requirements-test.txt or set BACKEND_TEST_LIVE=1"
+            print(f"⚠️  Skipping API tests: {reason}")
+            raise unittest.SkipTest(reason)
+        cls.patches = []
+        if not LIVE_BACKEND:
+            # Fresh in-memory database and config cache, shared by all tests like the real database
+            test_db = AsyncMongoMockClient()["test"]
+            cls.patches = [
+                mock.patch.object(server, "db", test_db),
+                mock.patch.object(server, "_config_cache", None),
+                mock.patch.object(server, "get_ai_response", stub_ai_response),
+            ]
+            for patch in cls.patches:
+                patch.start()
+        # Small, effectively constant GET bodies reused across tests; POST /config invalidates
+        cls._cache = {}
+        # Unique value written by test_07
+        cls.persist_token = f"test_value_{time.time_ns()}"
+        
+        # Schedule the post shared by the scheduling tests once, so no test depends on another
+        cls.scheduled_payload = {
+            "platform": "facebook",
+            "content": "This is a scheduled test post.",
+            "hashtags": ["test", "marketing"],
+            "scheduled_date": (datetime.utcnow() + timedelta(hours=1)).isoformat()
+        }
+        cls.scheduled_post = asyncio.run(cls._set_up_shared_state())
+        cls.post_id = cls.scheduled_post["id"]
+
+    @classmethod
+    def tearDownClass(cls):
+        asyncio.run(cls._delete_shared_post())
+        for patch in reversed(cls.patches):
+            patch.stop()
+
+    @classmethod
+    def _make_client(cls):
+        if not LIVE_BACKEND:
+            return httpx.AsyncClient(base_url=IN_PROCESS_URL, transport=httpx.ASGITransport(app=server.app))
+        # One HTTP/2 keep-alive client per test so independent requests can run concurrently
+        transport = httpx.AsyncHTTPTransport(
+            http2=True,
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+            retries=2
+        )
+        return httpx.AsyncClient(base_url=BACKEND_URL, transport=transport, timeout=60)
+
+    @classmethod
+    async def _set_up_shared_state(cls):
+        async with cls._make_client() as client:
+            if not LIVE_BACKEND:
+                response = await client.post("/config", json=TEST_API_KEYS)
+                response.raise_for_status()
+            response = await client.post("/schedule-post", json=cls.scheduled_payload)
+        response.raise_for_status()
+        return _json(response)
+
+    @classmethod
+    async def _delete_shared_post(cls):
+        async with cls._make_client() as client:
+            await client.delete(f"/scheduled-posts/{cls.post_id}")
+
+    async def asyncSetUp(self):
+        self.client = self._make_client()
+
+    async def asyncTearDown(self):
+        await self.client.aclose()
+
+    async def _cached_get(self, path):
+        """GET a small JSON resource once per test run"""
+        if path not in self._cache:
+            response = await self.client.get(path)
+            self.assertEqual(response.status_code, 200)
+            self._cache[path] = _json(response)
+        return self._cache[path]
+
+    async def test_01_health_check(self):
         """Test the health check endpoint"""
-        response = requests.get(f"{BACKEND_URL}/health")
+        response = await self.client.get("/health")
         self.assertEqual(response.status_code, 200)
-        data = response.json()
+        data = _json(response)
         self.assertEqual(data["status"], "healthy")
         self.assertIn("timestamp", data)
         print("✅ Health check endpoint is working")
 
-    def test_02_available_models(self):
+    async def test_02_available_models(self):
         """Test the available models endpoint"""
-        response = requests.get(f"{BACKEND_URL}/available-models")
-        self.assertEqual(response.status_code, 200)
-        data = response.json()
+        data = await self._cached_get("/available-models")
         
         # Check that all providers are present
         self.assertIn("openai", data)
@@ -43,11 +187,9 @@ class AIMarketingAssistantAPITest(unittest.TestCase):
         print(f"  - Gemini models: {len(data['gemini'])}")
         print(f"  - Groq models: {len(data['groq'])}")
 
-    def test_03_get_config(self):
+    async def test_03_get_config(self):
         """Test getting the API configuration"""
-        response = requests.get(f"{BACKEND_URL}/config")
-        self.assertEqual(response.status_code, 200)
-        data = response.json()
+        data = await self._cached_get("/config")
         
         # Check that the config has the expected fields
         self.assertIn("id", data)
@@ -70,12 +212,10 @@ class AIMarketingAssistantAPITest(unittest.TestCase):
         has_valid_key = any(key for key in self.api_keys.values() if key)
         print(f"✅ Get config endpoint is working (Has valid API keys: {has_valid_key})")
 
-    def test_04_update_config(self):
+    async def test_04_update_config(self):
         """Test updating the API configuration"""
         # First get the current configuration
-        response = requests.get(f"{BACKEND_URL}/config")
-        self.assertEqual(response.status_code, 200)
-        current_config = response.json()
+        current_config = await self._cached_get("/config")
         
         # Create a test configuration (preserving any existing API keys)
         test_config = {
@@ -86,32 +226,31 @@ class AIMarketingAssistantAPITest(unittest.TestCase):
             "unsplash_api_key": current_config.get("unsplash_api_key") or "test_unsplash_key"
         }
         
-        response = requests.post(f"{BACKEND_URL}/config", json=test_config)
+        response = await self.client.post("/config", json=test_config)
+        self._cache.pop("/config", None)
         self.assertEqual(response.status_code, 200)
-        data = response.json()
+        data = _json(response)
         
         # Check that the config was updated
         for key, value in test_config.items():
             self.assertEqual(data[key], value)
         
         # Verify persistence by getting the config again
-        response = requests.get(f"{BACKEND_URL}/config")
+        response = await self.client.get("/config")
         self.assertEqual(response.status_code, 200)
-        data = response.json()
+        data = _json(response)
         
         for key, value in test_config.items():
             self.assertEqual(data[key], value)
         
         print("✅ Update config endpoint is working and persists changes")
 
-    def test_05_rewrite_content_with_different_providers(self):
+    async def test_05_rewrite_content_with_different_providers(self):
         """Test content rewriting with different AI providers"""
         sample_content = "Our new product is amazing and everyone should buy it now"
         
         # Get available API keys
-        response = requests.get(f"{BACKEND_URL}/config")
-        self.assertEqual(response.status_code, 200)
-        config = response.json()
+        config = await self._cached_get("/config")
         
         providers_to_test = []
         if config.get("openai_api_key"):
@@ -128,26 +267,28 @@ class AIMarketingAssistantAPITest(unittest.TestCase):
         
         results = {}
         
-        for provider in providers_to_test:
-            request_data = {
+        def build_request(provider):
+            return {
                 "original_content": sample_content,
                 "tone_style": "Professional",
                 "platform": "facebook",
                 "ai_provider": provider,
                 "ai_model": self.get_default_model(provider)
             }
-            
-            response = requests.post(f"{BACKEND_URL}/rewrite-content", json=request_data)
-            
+        
+        # Rewrite with every provider concurrently
+        responses = await asyncio.gather(*[
+            self.client.post("/rewrite-content", json=build_request(provider))
+            for provider in providers_to_test
+        ])
+        
+        for provider, response in zip(providers_to_test, responses):
             if response.status_code == 200:
-                rewritten = response.json().get("rewritten_content", "")
+                rewritten = _json(response).get("rewritten_content", "")
                 
                 # Check that the response doesn't contain meta-commentary
-                self.assertFalse(
-                    any(phrase in rewritten.lower() for phrase in [
-                        "here's a rewritten", "i've rewritten", "here is a", 
-                        "here's how", "i would rewrite", "rewritten version"
-                    ]),
+                self.assertIsNone(
+                    META_COMMENTARY_RE.search(rewritten),
                     f"Rewritten content contains meta-commentary: {rewritten}"
                 )
                 
@@ -162,7 +303,7 @@ class AIMarketingAssistantAPITest(unittest.TestCase):
             else:
                 print(f"❌ Rewrite with {provider} failed: {response.status_code}")
                 if response.headers.get('content-type') == 'application/json':
-                    print(f"  Error: {response.json().get('detail', 'Unknown error')}")
+                    print(f"  Error: {_json(response).get('detail', 'Unknown error')}")
         
         # If we have results from multiple providers, check they're different
         if len(results) > 1:
@@ -178,7 +319,7 @@ class AIMarketingAssistantAPITest(unittest.TestCase):
                     )
                     print(f"✅ Results from {provider1} and {provider2} are different")
 
-    def test_06_analyze_post_with_different_content(self):
+    async def test_06_analyze_post_with_different_content(self):
         """Test post analysis with different content samples"""
         # Sample contents with expected relative scores
         samples = [
@@ -195,9 +336,7 @@ class AIMarketingAssistantAPITest(unittest.TestCase):
         ]
         
         # Get available API keys
-        response = requests.get(f"{BACKEND_URL}/config")
-        self.assertEqual(response.status_code, 200)
-        config = response.json()
+        config = await self._cached_get("/config")
         
         # Choose a provider that has an API key
         provider = None
@@ -211,18 +350,20 @@ class AIMarketingAssistantAPITest(unittest.TestCase):
         
         results = []
         
-        for sample in samples:
-            request_data = {
+        # Analyze every sample concurrently
+        responses = await asyncio.gather(*[
+            self.client.post("/analyze-post", json={
                 "content": sample["content"],
                 "platform": sample["platform"],
                 "ai_provider": provider,
                 "ai_model": self.get_default_model(provider)
-            }
-            
-            response = requests.post(f"{BACKEND_URL}/analyze-post", json=request_data)
-            
+            })
+            for sample in samples
+        ])
+        
+        for sample, response in zip(samples, responses):
             if response.status_code == 200:
-                analysis = response.json()
+                analysis = _json(response)
                 
                 # Check that we have all the expected score fields
                 self.assertIn("engagement_score", analysis)
@@ -267,7 +408,7 @@ class AIMarketingAssistantAPITest(unittest.TestCase):
             else:
                 print(f"❌ Analysis failed: {response.status_code}")
                 if response.headers.get('content-type') == 'application/json':
-                    print(f"  Error: {response.json().get('detail', 'Unknown error')}")
+                    print(f"  Error: {_json(response).get('detail', 'Unknown error')}")
         
         # If we have results for both samples, compare them
         if len(results) == 2:
@@ -296,52 +437,38 @@ class AIMarketingAssistantAPITest(unittest.TestCase):
             
             self.assertTrue(has_higher_score, "Professional content should have higher scores")
 
-    def test_07_config_persistence(self):
+    async def test_07_config_persistence(self):
         """Test that API configuration persists across requests"""
         # First, get the current configuration
-        response = requests.get(f"{BACKEND_URL}/config")
-        self.assertEqual(response.status_code, 200)
-        initial_config = response.json()
+        initial_config = await self._cached_get("/config")
         
         # Update with a unique test value
-        test_value = f"test_value_{datetime.utcnow().strftime('%Y%m%d%H%M%S')}"
         update_data = {
-            "openai_api_key": test_value
+            "openai_api_key": self.persist_token
         }
         
-        response = requests.post(f"{BACKEND_URL}/config", json=update_data)
+        response = await self.client.post("/config", json=update_data)
+        self._cache.pop("/config", None)
         self.assertEqual(response.status_code, 200)
         
-        # Verify the update was successful
-        response = requests.get(f"{BACKEND_URL}/config")
-        self.assertEqual(response.status_code, 200)
-        updated_config = response.json()
-        self.assertEqual(updated_config["openai_api_key"], test_value)
+        # Verify the update was successful; the server returns the stored config
+        updated_config = _json(response)
+        self.assertEqual(updated_config["openai_api_key"], self.persist_token)
         
         # Restore the original value
         restore_data = {
             "openai_api_key": initial_config["openai_api_key"] or ""
         }
         
-        response = requests.post(f"{BACKEND_URL}/config", json=restore_data)
+        response = await self.client.post("/config", json=restore_data)
+        self._cache.pop("/config", None)
         self.assertEqual(response.status_code, 200)
         
         print("✅ API configuration persists across requests")
 
-    def test_08_schedule_post(self):
+    async def test_08_schedule_post(self):
         """Test scheduling a post"""
-        scheduled_date = (datetime.utcnow() + timedelta(hours=1)).isoformat()
-        
-        request_data = {
-            "platform": "facebook",
-            "content": "This is a scheduled test post.",
-            "hashtags": ["test", "marketing"],
-            "scheduled_date": scheduled_date
-        }
-        
-        response = requests.post(f"{BACKEND_URL}/schedule-post", json=request_data)
-        self.assertEqual(response.status_code, 200)
-        data = response.json()
+        data = self.scheduled_post
         
         # Check that the post was scheduled
         self.assertIn("id", data)
@@ -350,40 +477,33 @@ class AIMarketingAssistantAPITest(unittest.TestCase):
         self.assertEqual(data["hashtags"], ["test", "marketing"])
         self.assertEqual(data["status"], "scheduled")
         
-        # Save the post ID for the next test
-        self.post_id = data["id"]
-        
         print("✅ Schedule post endpoint is working")
 
-    def test_09_get_scheduled_posts(self):
+    async def test_09_get_scheduled_posts(self):
         """Test getting scheduled posts"""
-        response = requests.get(f"{BACKEND_URL}/scheduled-posts")
+        response = await self.client.get("/scheduled-posts")
         self.assertEqual(response.status_code, 200)
-        data = response.json()
+        data = _json(response)
         
         # Check that we got a list of posts
         self.assertIsInstance(data, list)
         
         # Check if our previously scheduled post is in the list
-        if hasattr(self, 'post_id'):
-            post_found = False
-            for post in data:
-                if post["id"] == self.post_id:
-                    post_found = True
-                    break
-            
-            self.assertTrue(post_found, "Previously scheduled post not found")
+        ids = {post["id"] for post in data}
+        self.assertIn(self.post_id, ids, "Previously scheduled post not found")
         
         print(f"✅ Get scheduled posts endpoint is working, found {len(data)} posts")
 
-    def test_10_delete_scheduled_post(self):
+    async def test_10_delete_scheduled_post(self):
         """Test deleting a scheduled post"""
-        if not hasattr(self, 'post_id'):
-            self.skipTest("No post ID from previous test")
+        # Delete a post of its own; the shared post is removed in tearDownClass
+        response = await self.client.post("/schedule-post", json=self.scheduled_payload)
+        self.assertEqual(response.status_code, 200)
+        post_id = _json(response)["id"]
         
-        response = requests.delete(f"{BACKEND_URL}/scheduled-posts/{self.post_id}")
+        response = await self.client.delete(f"/scheduled-posts/{post_id}")
         self.assertEqual(response.status_code, 200)
-        data = response.json()
+        data = _json(response)
         
         # Check that the post was deleted
         self.assertIn("message", data)
@@ -391,9 +511,9 @@ class AIMarketingAssistantAPITest(unittest.TestCase):
         
         print("✅ Delete scheduled post endpoint is working")
 
-    def test_11_export_posts_error_handling(self):
+    async def test_11_export_posts_error_handling(self):
         """Test error handling for exporting posts with invalid IDs"""
-        response = requests.get(f"{BACKEND_URL}/export-posts/csv", params={"post_ids": ["invalid_id"]})
+        response = await self.client.get("/export-posts/csv", params={"post_ids": ["invalid_id"]})
         
         # We expect a 404 since the post doesn't exist
         self.assertEqual(response.status_code, 404)
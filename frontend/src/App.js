@@ -42,7 +42,7 @@ const apiService = {
   deleteScheduledPost: (id) => axios.delete(`${API}/scheduled-posts/${id}`),
   
   // Export
-  exportPosts: (format, postIds) => axios.get(`${API}/export-posts/${format}`, { params: { post_ids: postIds } }),
+  exportPosts: (format, postIds) => axios.get(`${API}/export-posts/${format}`, { params: { post_ids: postIds }, responseType: 'blob' }),
   
   // Images (temporarily disabled)
   searchImages: (query, page = 1) => axios.get(`${API}/search-images`, { params: { query, page } })
@@ -309,14 +309,11 @@ const PostGenerator = () => {
       const postIds = generatedPosts.map(post => post.id);
       const response = await apiService.exportPosts(format, postIds);
       
-      // Create and download file
-      const blob = new Blob([response.data.content], { 
-        type: format === 'csv' ? 'text/csv' : 'text/plain' 
-      });
-      const url = URL.createObjectURL(blob);
+      // Download the streamed file
+      const url = URL.createObjectURL(response.data);
       const a = document.createElement('a');
       a.href = url;
-      a.download = response.data.filename;
+      a.download = `posts.${format}`;
       document.body.appendChild(a);
       a.click();
       document.body.removeChild(a);
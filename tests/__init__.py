@@ -0,0 +1,7 @@
+import sys
+from pathlib import Path
+
+# Backend modules are imported top-level, the way uvicorn loads them from backend/
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
@@ -0,0 +1,56 @@
+import importlib.util
+import json
+import unittest
+from unittest import mock
+
+import tests  # noqa: F401  (puts backend/ on sys.path)
+from llm_cache import LLMCache, MemoryCacheBackend
+
+BACKEND_AVAILABLE = importlib.util.find_spec("emergentintegrations") is not None
+if BACKEND_AVAILABLE:
+    import pydantic
+    import server
+
+ANALYSIS = {
+    "engagement_score": 70,
+    "readability_score": 80,
+    "tone_consistency_score": 75,
+    "platform_best_practices_score": 65,
+    "overall_score": 72,
+    "improvement_tips": ["Add a call-to-action"]
+}
+
+@unittest.skipUnless(BACKEND_AVAILABLE, "backend dependencies not installed")
+class CachedAIResponseTest(unittest.IsolatedAsyncioTestCase):
+    """Tests for caching validated AI responses"""
+
+    def setUp(self):
+        self.provider = mock.AsyncMock()
+        patches = [
+            mock.patch.object(server, "llm_cache", LLMCache(MemoryCacheBackend())),
+            mock.patch.object(server, "get_ai_response", self.provider),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    async def get_analysis(self):
+        return await server.get_cached_ai_response(
+            "prompt", server.AIProvider.OPENAI, "gpt-4o-mini", "key", server.AIAnalysisResponse
+        )
+
+    async def test_valid_response_is_cached(self):
+        self.provider.return_value = json.dumps(ANALYSIS)
+        first = await self.get_analysis()
+        second = await self.get_analysis()
+        self.assertEqual(first, second)
+        self.assertEqual(first.overall_score, 72)
+        self.provider.assert_awaited_once()
+
+    async def test_malformed_response_is_not_cached(self):
+        self.provider.side_effect = ["not json", json.dumps(ANALYSIS)]
+        with self.assertRaises(pydantic.ValidationError):
+            await self.get_analysis()
+        analysis = await self.get_analysis()
+        self.assertEqual(analysis.overall_score, 72)
+        self.assertEqual(self.provider.await_count, 2)
@@ -0,0 +1,59 @@
+import asyncio
+import importlib.util
+import unittest
+from unittest import mock
+
+import tests  # noqa: F401  (puts backend/ on sys.path)
+
+BACKEND_AVAILABLE = importlib.util.find_spec("emergentintegrations") is not None
+if BACKEND_AVAILABLE:
+    import server
+
+class SlowConfigCollection:
+    """api_configurations stand-in whose find_one blocks until released"""
+
+    def __init__(self, document):
+        self.document = document
+        self.reading = asyncio.Event()
+        self.release = asyncio.Event()
+
+    async def find_one(self, query):
+        self.reading.set()
+        await self.release.wait()
+        return dict(self.document)
+
+@unittest.skipUnless(BACKEND_AVAILABLE, "backend dependencies not installed")
+class ConfigCacheTest(unittest.IsolatedAsyncioTestCase):
+    """Tests for the in-process API configuration cache"""
+
+    def setUp(self):
+        server._config_cache = None
+        self.addCleanup(setattr, server, "_config_cache", None)
+
+    async def test_write_during_load_is_not_overwritten_by_stale_read(self):
+        collection = SlowConfigCollection({"user_id": "default", "openai_api_key": "old"})
+        fake_db = mock.Mock(api_configurations=collection)
+        with mock.patch.object(server, "db", fake_db):
+            reader = asyncio.create_task(server.get_cached_config())
+            await collection.reading.wait()
+
+            # The write lands while the reader still holds the pre-write document
+            writer = asyncio.create_task(server.set_cached_config({"user_id": "default", "openai_api_key": "new"}))
+            await asyncio.sleep(0)
+            collection.release.set()
+            await asyncio.gather(reader, writer)
+
+            config = await server.get_cached_config()
+        self.assertEqual(config["openai_api_key"], "new")
+
+    async def test_config_is_read_once(self):
+        collection = SlowConfigCollection({"user_id": "default", "openai_api_key": "key"})
+        collection.release.set()
+        fake_db = mock.Mock(api_configurations=collection)
+        with mock.patch.object(server, "db", fake_db), \
+                mock.patch.object(collection, "find_one", wraps=collection.find_one) as find_one:
+            await asyncio.gather(*[server.get_cached_config() for _ in range(5)])
+        self.assertEqual(find_one.call_count, 1)
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
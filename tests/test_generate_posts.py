@@ -0,0 +1,70 @@
+import asyncio
+import importlib.util
+import json
+import unittest
+from unittest import mock
+
+import tests  # noqa: F401  (puts backend/ on sys.path)
+
+BACKEND_AVAILABLE = importlib.util.find_spec("emergentintegrations") is not None
+if BACKEND_AVAILABLE:
+    import pydantic
+    import server
+
+@unittest.skipUnless(BACKEND_AVAILABLE, "backend dependencies not installed")
+class GeneratePostsTest(unittest.IsolatedAsyncioTestCase):
+    """Tests for concurrent post generation"""
+
+    def setUp(self):
+        self.active_calls = 0
+        self.max_active_calls = 0
+        self.fake_db = mock.Mock()
+        self.fake_db.generated_posts.insert_many = mock.AsyncMock()
+        patches = [
+            mock.patch.object(server, "db", self.fake_db),
+            mock.patch.object(server, "get_cached_config", mock.AsyncMock(return_value={"openai_api_key": "key"})),
+            mock.patch.object(server, "get_ai_response", self.fake_ai_response),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    async def fake_ai_response(self, prompt, provider, model, api_key):
+        self.active_calls += 1
+        self.max_active_calls = max(self.max_active_calls, self.active_calls)
+        await asyncio.sleep(0.01)
+        self.active_calls -= 1
+        return json.dumps({"content": prompt.splitlines()[-1]})
+
+    def build_request(self, variants_count):
+        return server.PostGenerationRequest(
+            platforms=list(server.Platform),
+            post_type=server.PostType.PROMOTIONAL,
+            product_description="Running shoes",
+            tone_style=server.ToneStyle.FRIENDLY,
+            variants_count=variants_count
+        )
+
+    async def test_provider_calls_are_bounded(self):
+        posts = await server.generate_posts(self.build_request(server.MAX_VARIANTS))
+
+        self.assertLessEqual(self.max_active_calls, server.MAX_CONCURRENT_AI_CALLS)
+        self.assertGreater(self.max_active_calls, 1)
+        self.assertEqual([post.variant_number for post in posts], list(range(1, server.MAX_VARIANTS + 1)))
+        for post in posts:
+            self.assertEqual([content.platform for content in post.post_contents], list(server.Platform))
+        self.fake_db.generated_posts.insert_many.assert_awaited_once()
+
+    async def test_missing_api_key_is_a_client_error(self):
+        with mock.patch.object(server, "get_cached_config", mock.AsyncMock(return_value={"groq_api_key": "key"})):
+            with self.assertRaises(server.HTTPException) as raised:
+                await server.generate_posts(self.build_request(1))
+        self.assertEqual(raised.exception.status_code, 400)
+        self.assertEqual(raised.exception.detail, "API key for openai not configured.")
+
+    def test_variants_count_is_bounded(self):
+        with self.assertRaises(pydantic.ValidationError):
+            self.build_request(server.MAX_VARIANTS + 1)
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,34 @@
+import importlib.util
+import unittest
+from unittest import mock
+
+import tests  # noqa: F401  (puts backend/ on sys.path)
+
+BACKEND_AVAILABLE = importlib.util.find_spec("emergentintegrations") is not None
+if BACKEND_AVAILABLE:
+    from pymongo.errors import DuplicateKeyError, ServerSelectionTimeoutError
+    import server
+
+@unittest.skipUnless(BACKEND_AVAILABLE, "backend dependencies not installed")
+class InitIndexesTest(unittest.IsolatedAsyncioTestCase):
+    """Tests for startup index creation"""
+
+    async def init_indexes(self, side_effect):
+        fake_db = mock.MagicMock()
+        fake_db.__getitem__.return_value.create_index = mock.AsyncMock(side_effect=side_effect)
+        with mock.patch.object(server, "db", fake_db):
+            await server.init_indexes()
+        return fake_db.__getitem__.return_value.create_index
+
+    async def test_duplicate_key_does_not_stop_startup(self):
+        create_index = await self.init_indexes([DuplicateKeyError("dup")] + [None] * (len(server.INDEXES) - 1))
+        self.assertEqual(create_index.await_count, len(server.INDEXES))
+        for call in create_index.await_args_list:
+            self.assertNotIn("background", call.kwargs)
+
+    async def test_unreachable_database_is_tried_once(self):
+        create_index = await self.init_indexes(ServerSelectionTimeoutError("down"))
+        create_index.assert_awaited_once()
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,75 @@
+import unittest
+from unittest import mock
+
+from llm_cache import LLMCache, MemoryCacheBackend, make_cache_key
+
+class FailingBackend:
+    """Backend whose every operation raises, like an unreachable Redis"""
+
+    async def get(self, key):
+        raise ConnectionError("backend down")
+
+    async def set(self, key, value, ttl):
+        raise ConnectionError("backend down")
+
+    async def close(self):
+        pass
+
+class LLMCacheTest(unittest.IsolatedAsyncioTestCase):
+    """Tests for the LLM completion cache"""
+
+    async def test_hit_and_miss_counting(self):
+        cache = LLMCache(MemoryCacheBackend())
+        self.assertIsNone(await cache.get("key"))
+        await cache.set("key", "completion")
+        self.assertEqual(await cache.get("key"), "completion")
+        self.assertEqual(await cache.get("key"), "completion")
+
+        stats = cache.get_stats()
+        self.assertEqual(stats["hits"], 2)
+        self.assertEqual(stats["misses"], 1)
+        self.assertEqual(stats["errors"], 0)
+        self.assertAlmostEqual(stats["hit_rate"], 2 / 3)
+
+    async def test_entries_expire_after_ttl(self):
+        backend = MemoryCacheBackend()
+        with mock.patch("llm_cache.time.monotonic", return_value=100.0):
+            await backend.set("key", "completion", ttl=10)
+        with mock.patch("llm_cache.time.monotonic", return_value=109.0):
+            self.assertEqual(await backend.get("key"), "completion")
+        with mock.patch("llm_cache.time.monotonic", return_value=111.0):
+            self.assertIsNone(await backend.get("key"))
+        self.assertNotIn("key", backend._entries)
+
+    async def test_maxsize_evicts_least_recently_used(self):
+        backend = MemoryCacheBackend(maxsize=2)
+        await backend.set("a", "1", ttl=60)
+        await backend.set("b", "2", ttl=60)
+        # Reading "a" makes "b" the least recently used entry
+        self.assertEqual(await backend.get("a"), "1")
+        await backend.set("c", "3", ttl=60)
+
+        self.assertIsNone(await backend.get("b"))
+        self.assertEqual(await backend.get("a"), "1")
+        self.assertEqual(await backend.get("c"), "3")
+
+    async def test_backend_errors_are_swallowed(self):
+        cache = LLMCache(FailingBackend())
+        self.assertIsNone(await cache.get("key"))
+        await cache.set("key", "completion")
+
+        stats = cache.get_stats()
+        self.assertEqual(stats["errors"], 2)
+        self.assertEqual(stats["misses"], 1)
+        self.assertEqual(stats["hits"], 0)
+
+    def test_cache_key_depends_on_every_input(self):
+        key = make_cache_key("openai", "gpt-4o-mini", "system", "prompt")
+        self.assertEqual(key, make_cache_key("openai", "gpt-4o-mini", "system", "prompt"))
+        self.assertNotEqual(key, make_cache_key("groq", "gpt-4o-mini", "system", "prompt"))
+        self.assertNotEqual(key, make_cache_key("openai", "gpt-4.1", "system", "prompt"))
+        self.assertNotEqual(key, make_cache_key("openai", "gpt-4o-mini", "other", "prompt"))
+        self.assertNotEqual(key, make_cache_key("openai", "gpt-4o-mini", "system", "other"))
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,22 @@
+import importlib.util
+import subprocess
+import sys
+import unittest
+
+from tests import BACKEND_DIR
+
+@unittest.skipUnless(importlib.util.find_spec("emergentintegrations"), "backend dependencies not installed")
+class ServerImportTest(unittest.TestCase):
+    """The backend must load the way entrypoint.sh starts it: `cd backend && uvicorn server:app`"""
+
+    def test_server_imports_as_top_level_module(self):
+        result = subprocess.run(
+            [sys.executable, "-c", "import server; assert server.app is not None"],
+            cwd=BACKEND_DIR,
+            capture_output=True,
+            text=True
+        )
+        self.assertEqual(result.returncode, 0, result.stderr)
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)